@@ -31,7 +31,7 @@ for file in "${required_files[@]}"; do
 done
 
 # Create required directories if they don't exist
-mkdir -p output uploads
+mkdir -p voice-notes
 
 echo "Building Speech-to-Text Server Docker image..."
 echo "Using CUDA base image for minimal size"
@@ -49,8 +49,7 @@ echo "Build complete!"
 echo
 echo "You can run the server with:"
 echo "docker run --gpus all -p 8000:8000 \\"
-echo "  -v ./output:/app/output \\"
-echo "  -v ./uploads:/app/uploads \\"
+echo "  -v ./voice-notes:/app/vnotes \\"
 echo "  stt-server:latest"
 echo
 echo "To verify GPU support:"
@@ -1,16 +1,29 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Form
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import tempfile
 import os
+import json
+import asyncio
 import logging
+import logging.handlers
+import queue
+import atexit
+import time
+import numpy as np
 import torch
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps, merge_segments
 from pydantic import BaseModel, Field
-import shutil
 from datetime import datetime
-from typing import List
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Union, BinaryIO
+import aiofiles
+import dataclasses
+import hashlib
+from collections import OrderedDict
 """
  This file contains the core backend logic for the application. 
  It uses the FastAPI framework to create a web server that handles speech-to-text transcription,
@@ -18,24 +31,27 @@ from typing import List
 """
 # The purpose of this code is to provide a web interface for speech-to-text functionality using FastAPI and the Faster Whisper model.
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: records are queued by request handlers and written
+# by a background listener thread so log I/O never blocks the event loop
+log_queue = queue.Queue(-1)
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_handler, respect_handler_level=True)
+# Added directly rather than through basicConfig, which would give the QueueHandler its own
+# formatter and have every message formatted twice
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
-# Create output directory
-OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Create temp directory for uploaded files
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # Base directory for voice notes
 VNOTES_DIR = "/app/vnotes"
 
+# Audio extensions a saved note may have next to its .txt transcription
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.ogg', '.webm']
+
 # Prototype checkpoint directory
 CHECKPOINT_DIR = "/tmp/voice_notes_checkpoints"
 os.makedirs(CHECKPOINT_DIR, exist_ok=True)
@@ -50,6 +66,125 @@ templates = Jinja2Templates(directory="templates")
 
 # Initialize Whisper model
 model = None
+batched_model = None
+
+# Model size name or path to a pre-converted (e.g. int8_float16) CTranslate2 model directory
+MODEL_NAME = os.getenv("STT_MODEL", "large-v3")
+
+# Where model weights are downloaded/cached; the Docker image bakes them into /models
+MODEL_DIR = os.getenv("STT_MODEL_DIR", os.path.join(os.path.dirname(__file__), "models"))
+LOCAL_FILES_ONLY = os.getenv("STT_LOCAL_FILES_ONLY", "0") == "1"
+
+# CTranslate2 intra-op threads; defaults to every core since one inference thread owns the model
+CPU_THREADS = int(os.getenv("STT_CPU_THREADS", str(os.cpu_count() or 0)))
+
+# Try CTranslate2 Flash Attention on Ampere+ GPUs (falls back automatically if unsupported)
+FLASH_ATTENTION = os.getenv("STT_FLASH_ATTENTION", "1") == "1"
+
+# GPU this worker process runs its models on (claimed at startup when several GPUs are present)
+gpu_index = 0
+_gpu_lock_file = None
+
+# CTranslate2 compute type override (e.g. "float16", "int8_float32"); empty picks int8 per device
+COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "")
+
+# Optional smaller model for latency-sensitive requests (empty disables it)
+FAST_MODEL = os.getenv("STT_FAST_MODEL", "large-v3-turbo")
+fast_model = None
+batched_fast_model = None
+
+# Optional English-only model (e.g. "distil-large-v3") used for requests known to be English;
+# the Docker image only contains it when built with the matching STT_ENGLISH_MODEL build arg
+ENGLISH_MODEL = os.getenv("STT_ENGLISH_MODEL", "")
+english_model = None
+batched_english_model = None
+
+# Number of 30s audio windows decoded together by the batched pipeline; the windows
+# of one call may come from several queued requests
+BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+
+# When the worker is idle, wait this long after a request arrives so concurrent
+# requests can share its first batch (no wait while the worker is busy)
+BATCH_WINDOW_MS = int(os.getenv("STT_BATCH_WINDOW_MS", "20"))
+
+# Requests are scheduled fewest-remaining-windows first; one queued longer than this many seconds
+# jumps ahead (oldest first) so long recordings and other models are never starved by short notes
+MAX_QUEUE_WAIT_SECONDS = float(os.getenv("STT_MAX_QUEUE_WAIT", "10"))
+SAMPLE_RATE = 16000
+CHUNK_LENGTH = 30  # seconds per Whisper window
+SHORT_CLIP_SECONDS = 30  # clips shorter than this default to greedy decoding
+
+# Silero VAD settings used to strip silence before the encoder runs
+VAD_PARAMETERS = dict(min_silence_duration_ms=500, speech_pad_ms=200)
+
+# Last confidently detected language per user code as (language, detected_at), passed to
+# later requests so Whisper can skip its language-ID pass; entries expire after
+# LANGUAGE_CACHE_TTL_SECONDS so a user switching language is re-detected
+user_lang_cache = {}
+LANGUAGE_CACHE_MIN_PROBABILITY = 0.6
+LANGUAGE_CACHE_TTL_SECONDS = int(os.getenv("STT_LANGUAGE_CACHE_TTL", "600"))
+
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Single inference thread so requests never contend for the model
+stt_executor = ThreadPoolExecutor(max_workers=1)
+
+# Separate bounded pool for ffmpeg decoding/resampling so the next upload
+# is decoded while the inference thread is busy with the current one
+decode_executor = ThreadPoolExecutor(max_workers=int(os.getenv("STT_DECODE_WORKERS", "2")))
+
+# Created in startup_event once the event loop is running
+transcribe_queue = None
+batch_worker_task = None
+
+# Parsed users.txt, re-read only when the file's mtime (in ns) changes
+_user_cache = {"mtime": None, "map": {}}
+
+# User directories whose subfolders were already created by this process
+_ensured_user_dirs = set()
+
+# Saved-notes previews per folder path: {txt name: ((txt, sidecar) signatures, (preview, metadata))};
+# keyed per file so a listing taken mid-save is refreshed once the files change
+_notes_index = {}
+
+# Recent results keyed on (upload bytes digest, pipeline, requested options), least recently used first;
+# identical requests still running share one task via _transcriptions_in_flight
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv("STT_TRANSCRIPTION_CACHE_SIZE", "256"))
+_transcription_cache = OrderedDict()
+_transcriptions_in_flight = {}
+
+# RESPONSE MODELS
+# Routes declaring these are serialized straight to JSON bytes by Pydantic, which matters for the
+# larger payloads: long transcripts and saved-notes listings
+class TranscriptionResult(BaseModel):
+    text: str
+    language: Optional[str] = None
+    language_probability: Optional[float] = None
+
+class SavedTranscriptionResult(TranscriptionResult):
+    folder_used: str
+    user_code: str
+    saved_files: Dict[str, str]
+    timestamp: str
+
+class OpenAITranscriptionResult(BaseModel):
+    text: str
+
+class SavedNote(BaseModel):
+    timestamp: str
+    folder: str
+    folder_display: str
+    transcription_file: str
+    audio_file: Optional[str] = None
+    content_preview: str
+    language: Optional[str] = None
+    language_probability: Optional[float] = None
+    duration: Optional[float] = None
+
+class SavedNotesList(BaseModel):
+    notes: List[SavedNote]
+    user_code: str
 
 # USER MANAGEMENT FUNCTIONS
 def load_user_mapping():
@@ -57,22 +192,37 @@ def load_user_mapping():
     users_file = os.path.join(VNOTES_DIR, "users.txt")
     user_mapping = {}
     
-    if os.path.exists(users_file):
-        try:
-            with open(users_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and '=' in line:
-                        code, directory = line.split('=', 1)
-                        user_mapping[code.strip()] = directory.strip()
-            logger.info(f"Loaded {len(user_mapping)} users from mapping file")
-        except Exception as e:
-            logger.error(f"Error loading user mapping: {str(e)}")
-    else:
-        logger.warning(f"User mapping file not found: {users_file}")
+    try:
+        mtime = os.stat(users_file).st_mtime_ns
+    except FileNotFoundError:
+        logger.warning("User mapping file not found: %s", users_file)
+        return user_mapping
+    
+    if mtime == _user_cache["mtime"]:
+        return _user_cache["map"]
+    
+    try:
+        with open(users_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and '=' in line:
+                    code, directory = line.split('=', 1)
+                    user_mapping[code.strip()] = directory.strip()
+        _user_cache["mtime"] = mtime
+        _user_cache["map"] = user_mapping
+        logger.info("Loaded %s users from mapping file", len(user_mapping))
+    except Exception as e:
+        logger.error("Error loading user mapping: %s", e)
     
     return user_mapping
 
+def get_cached_language(user_code: str) -> Optional[str]:
+    """Return the user's recently detected language, or None once the entry has expired"""
+    entry = user_lang_cache.get(user_code)
+    if entry is None or time.monotonic() - entry[1] > LANGUAGE_CACHE_TTL_SECONDS:
+        return None
+    return entry[0]
+
 def get_user_directory(user_code: str) -> str:
     """Get the directory path for a user code"""
     user_mapping = load_user_mapping()
@@ -82,38 +232,445 @@ def get_user_directory(user_code: str) -> str:
     
     user_dir = os.path.join(VNOTES_DIR, "users", user_mapping[user_code])
     
-    # Ensure user directory and subdirectories exist
-    base_folders = ["daily_notes", "meeting_notes", "ideas", "research"]
-    for folder in base_folders:
-        folder_path = os.path.join(user_dir, folder)
-        os.makedirs(folder_path, exist_ok=True)
+    # Ensure user directory and subdirectories exist (once per process)
+    if user_dir not in _ensured_user_dirs:
+        base_folders = ["daily_notes", "meeting_notes", "ideas", "research"]
+        for folder in base_folders:
+            folder_path = os.path.join(user_dir, folder)
+            os.makedirs(folder_path, exist_ok=True)
+        _ensured_user_dirs.add(user_dir)
     
-    logger.info(f"User {user_code} mapped to directory: {user_dir}")
+    logger.info("User %s mapped to directory: %s", user_code, user_dir)
     return user_dir
 
+# TRANSCRIPTION QUEUE FUNCTIONS
+def _batch_group(job: dict) -> tuple:
+    """Jobs can share a pipeline call only with the same model, language and decode options"""
+    return id(job["pipeline"]), job["language"], json.dumps(job["options"], sort_keys=True)
+
+def _detect_languages(jobs: List[dict]) -> list:
+    """Detect each job's language from its first speech window on the inference thread"""
+    results = []
+    for job in jobs:
+        try:
+            whisper_model = job["pipeline"].model
+            if not whisper_model.model.is_multilingual:
+                results.append(("en", 1.0))
+                continue
+            first = job["clips"][0]
+            language, probability, _ = whisper_model.detect_language(
+                audio=job["audio"][first["start"]:first["end"]]
+            )
+            results.append((language, probability))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def _run_windows(pipeline: BatchedInferencePipeline, language: str, options: dict, windows: List[tuple]) -> list:
+    """Transcribe (job, clip) windows, possibly from several requests, in one batched pipeline call
+
+    Each window is padded to its own 30s slot so the pipeline never merges windows of different
+    requests; segments are handed back per window and shifted to source-audio time.
+    """
+    slot = CHUNK_LENGTH * SAMPLE_RATE
+    batch_audio = np.zeros(slot * len(windows), dtype=np.float32)
+    for index, (job, clip) in enumerate(windows):
+        batch_audio[index * slot:index * slot + clip["end"] - clip["start"]] = job["audio"][clip["start"]:clip["end"]]
+    
+    segments, _ = pipeline.transcribe(
+        batch_audio,
+        language=language,
+        batch_size=BATCH_SIZE,
+        vad_filter=False,
+        clip_timestamps=[{"start": index * slot, "end": (index + 1) * slot} for index in range(len(windows))],
+        **options
+    )
+    
+    results = [[] for _ in windows]
+    for segment in segments:
+        index = min(int(segment.start // CHUNK_LENGTH), len(windows) - 1)
+        clip = windows[index][1]
+        shift = clip["start"] / SAMPLE_RATE - index * CHUNK_LENGTH
+        results[index].append(dataclasses.replace(
+            segment,
+            start=round(segment.start + shift, 3),
+            end=round(min(segment.end + shift, clip["end"] / SAMPLE_RATE), 3)
+        ))
+    return results
+
+def _finish_job(job: dict, error: Exception = None):
+    """Resolve a job's future unless its client already went away"""
+    if job["future"].done():
+        return
+    if error is not None:
+        job["future"].set_exception(error)
+        return
+    job["future"].set_result((job["segments"], SimpleNamespace(
+        language=job["language"],
+        language_probability=job["language_probability"],
+        duration=job["duration"],
+        duration_after_vad=sum(clip["end"] - clip["start"] for clip in job["clips"]) / SAMPLE_RATE
+    )))
+
+async def transcription_worker():
+    """Feed queued requests to the model window by window, batching windows across requests"""
+    loop = asyncio.get_running_loop()
+    pending = []
+    while True:
+        if not pending:
+            pending.append(await transcribe_queue.get())
+            await asyncio.sleep(BATCH_WINDOW_MS / 1000)
+        while not transcribe_queue.empty():
+            pending.append(transcribe_queue.get_nowait())
+        
+        # Language detection runs once per request, before any of its windows are batched
+        undetected = [job for job in pending if job["language"] is None and not job["future"].done()]
+        if undetected:
+            detections = await loop.run_in_executor(stt_executor, _detect_languages, undetected)
+            for job, detection in zip(undetected, detections):
+                if isinstance(detection, Exception):
+                    _finish_job(job, detection)
+                else:
+                    job["language"], job["language_probability"] = detection
+        
+        # Skip requests whose client went away (or that failed detection)
+        pending = [job for job in pending if not job["future"].done()]
+        if not pending:
+            continue
+        
+        # Fewest remaining windows first so short notes never wait behind a long recording, unless
+        # a request has waited past MAX_QUEUE_WAIT_SECONDS: those lead, oldest first, so every
+        # request eventually leads a batch; compatible requests fill the rest of the batch
+        now = time.monotonic()
+        pending.sort(key=lambda job: (
+            (0, job["enqueued_at"]) if now - job["enqueued_at"] > MAX_QUEUE_WAIT_SECONDS
+            else (1, len(job["clips"]) - job["next_clip"])
+        ))
+        lead = pending[0]
+        group = _batch_group(lead)
+        windows = []
+        for job in pending:
+            if _batch_group(job) != group:
+                continue
+            while job["next_clip"] < len(job["clips"]) and len(windows) < BATCH_SIZE:
+                windows.append((job, job["clips"][job["next_clip"]]))
+                job["next_clip"] += 1
+            if len(windows) == BATCH_SIZE:
+                break
+        
+        jobs = list({id(job): job for job, _ in windows}.values())
+        try:
+            results = await loop.run_in_executor(
+                stt_executor, _run_windows, lead["pipeline"], lead["language"], lead["options"], windows
+            )
+        except Exception as e:
+            for job in jobs:
+                _finish_job(job, e)
+        else:
+            for (job, _), segments in zip(windows, results):
+                job["segments"].extend(segments)
+            for job in jobs:
+                if job["next_clip"] == len(job["clips"]):
+                    _finish_job(job)
+        
+        if len(jobs) > 1:
+            logger.info("Transcribed %s windows from %s requests in one batch", len(windows), len(jobs))
+        pending = [job for job in pending if not job["future"].done()]
+
+def _select_pipeline(model_choice: str, language: Optional[str] = None) -> BatchedInferencePipeline:
+    """Return the batched pipeline for a "fast" or "accurate" model choice and known language
+
+    Audio known to be English goes to the English-only model whenever one is loaded; it
+    matches large-v3 accuracy on English at a fraction of the cost.
+    """
+    if language == "en" and batched_english_model is not None:
+        return batched_english_model
+    if model_choice == "fast" and batched_fast_model is not None:
+        return batched_fast_model
+    return batched_model
+
+def _decode_and_find_windows(audio_input: Union[str, BinaryIO], vad_parameters: Optional[dict]):
+    """Decode audio to 16 kHz mono samples and split it into the <=30s windows Whisper should see
+
+    With VAD the windows are the merged speech regions (empty for pure silence), exactly as the
+    batched pipeline would compute them itself; without VAD they are fixed 30s slices.
+    """
+    audio = decode_audio(audio_input, sampling_rate=SAMPLE_RATE)
+    window = CHUNK_LENGTH * SAMPLE_RATE
+    if vad_parameters is None:
+        return audio, [
+            {"start": start, "end": min(start + window, len(audio))}
+            for start in range(0, len(audio), window)
+        ]
+    vad_options = VadOptions(**{**vad_parameters, "max_speech_duration_s": CHUNK_LENGTH})
+    speech = get_speech_timestamps(audio, vad_options)
+    return audio, [
+        {"start": clip["start"], "end": min(clip["end"], clip["start"] + window)}
+        for clip in merge_segments(speech, vad_options)
+    ]
+
+def _digest_audio_input(audio_input: Union[str, BinaryIO]) -> str:
+    """Digest the raw audio bytes of a path or file object to key the transcription cache
+
+    Read in chunks rather than with hashlib.file_digest, which needs Python 3.11 (the image has
+    3.10); a file object is rewound to where it was so it can still be decoded afterwards.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    audio_file = open(audio_input, "rb") if isinstance(audio_input, str) else audio_input
+    start = audio_file.tell()
+    try:
+        while chunk := audio_file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    finally:
+        if audio_file is audio_input:
+            audio_file.seek(start)
+        else:
+            audio_file.close()
+    return digest.hexdigest()
+
+def _finish_cached_transcription(key: tuple, entry: dict):
+    """Move a finished shared transcription from the in-flight map into the LRU cache"""
+    if _transcriptions_in_flight.get(key) is entry:
+        del _transcriptions_in_flight[key]
+    task = entry["task"]
+    if task.cancelled() or task.exception() is not None:
+        return
+    _transcription_cache[key] = task.result()
+    while len(_transcription_cache) > TRANSCRIPTION_CACHE_SIZE:
+        _transcription_cache.popitem(last=False)
+
+async def _transcribe(audio_input: Union[str, BinaryIO], pipeline: BatchedInferencePipeline = None, **options):
+    """Transcribe an audio path or file, reusing the result of identical audio with identical options"""
+    pipeline = pipeline or batched_model
+    loop = asyncio.get_running_loop()
+    vad_filter = options.pop("vad_filter", True)
+    vad_parameters = options.pop("vad_parameters", None)
+    vad_parameters = (vad_parameters or {}) if vad_filter else None
+    language = options.pop("language", None)
+    
+    if TRANSCRIPTION_CACHE_SIZE <= 0:
+        audio, clips = await loop.run_in_executor(
+            decode_executor, _decode_and_find_windows, audio_input, vad_parameters
+        )
+        return await _transcribe_decoded(pipeline, audio, clips, language, options)
+    
+    # Key on the raw upload bytes and the options as requested (an unset beam_size stays unset),
+    # so a repeated upload is answered without decoding, VAD or the model
+    digest = await loop.run_in_executor(decode_executor, _digest_audio_input, audio_input)
+    key = (digest, id(pipeline), json.dumps({**options, "language": language, "vad": vad_parameters}, sort_keys=True))
+    
+    entry = _transcriptions_in_flight.get(key)
+    if entry is None and key not in _transcription_cache:
+        # Decode in this request so the shared task owns the samples rather than an upload that is
+        # closed when this request ends; an identical request may have got further meanwhile
+        audio, clips = await loop.run_in_executor(
+            decode_executor, _decode_and_find_windows, audio_input, vad_parameters
+        )
+        entry = _transcriptions_in_flight.get(key)
+        if entry is None and key not in _transcription_cache:
+            entry = {
+                "task": asyncio.create_task(_transcribe_decoded(pipeline, audio, clips, language, options)),
+                "waiters": 0
+            }
+            _transcriptions_in_flight[key] = entry
+            entry["task"].add_done_callback(lambda _: _finish_cached_transcription(key, entry))
+    if entry is None:
+        _transcription_cache.move_to_end(key)
+        return _transcription_cache[key]
+    
+    # Identical requests still running share one task
+    entry["waiters"] += 1
+    try:
+        # Shielded so one disconnecting client does not cancel the work others are waiting on
+        return await asyncio.shield(entry["task"])
+    finally:
+        entry["waiters"] -= 1
+        # The last interested client went away: cancel, so the worker skips the queued job. The
+        # entry is unpublished first so an identical request arriving before the task finishes
+        # cancelling starts afresh instead of awaiting a task that is about to be cancelled
+        if entry["waiters"] == 0 and not entry["task"].done():
+            if _transcriptions_in_flight.get(key) is entry:
+                del _transcriptions_in_flight[key]
+            entry["task"].cancel()
+
+async def _transcribe_decoded(pipeline: BatchedInferencePipeline, audio: np.ndarray, clips: List[dict],
+                              language: Optional[str], options: dict):
+    """Transcribe decoded samples: pure silence is answered at once, speech goes through the queue"""
+    duration = len(audio) / SAMPLE_RATE
+    if not clips:
+        # Nothing but silence: skip the queue and the model entirely
+        return [], SimpleNamespace(
+            language=language,
+            language_probability=0.0,
+            duration=duration,
+            duration_after_vad=0.0
+        )
+    if options.get("beam_size") is None:
+        # Greedy decoding matches beam search on short voice notes at a fraction of the cost
+        options = {**options, "beam_size": 1 if duration < SHORT_CLIP_SECONDS else 5}
+    return await _queue_transcription(pipeline, audio, clips, duration, language, options)
+
+async def _queue_transcription(pipeline: BatchedInferencePipeline, audio: np.ndarray, clips: List[dict],
+                               duration: float, language: Optional[str], options: dict):
+    """Queue decoded audio and its windows for the transcription worker and return its (segments, info)"""
+    future = asyncio.get_running_loop().create_future()
+    await transcribe_queue.put({
+        "future": future,
+        "pipeline": pipeline,
+        "audio": audio,
+        "clips": clips,
+        "next_clip": 0,
+        "segments": [],
+        "duration": duration,
+        "language": language,
+        "language_probability": None,  # stays None when the caller supplied the language
+        "options": options,
+        "enqueued_at": time.monotonic()
+    })
+    return await future
+
+def _join_segments(segments) -> str:
+    """Join segment texts with single spaces (Whisper prefixes each segment with its own space)"""
+    return " ".join(segment.text.strip() for segment in segments)
+
+async def _write_text_atomic(path: str, content: str):
+    """Write a text file under a temporary name and rename it into place so readers never see it partial"""
+    partial_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.part")
+    async with aiofiles.open(partial_path, "w", encoding="utf-8") as f:
+        await f.write(content)
+    os.replace(partial_path, path)
+
+async def _save_upload(upload: UploadFile, path: str) -> int:
+    """Stream an upload to disk in fixed-size chunks and return the number of bytes written"""
+    size_bytes = 0
+    async with aiofiles.open(path, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+            size_bytes += len(chunk)
+    return size_bytes
+
+def _claim_gpu_index() -> int:
+    """Claim a GPU for this worker with a kernel-held lock so sibling workers spread evenly"""
+    global _gpu_lock_file
+    gpu_count = torch.cuda.device_count()
+    if gpu_count <= 1:
+        return 0
+    import fcntl  # POSIX only; multi-GPU serving is Linux-only
+    
+    # The kernel drops a flock when its holder dies, so a respawned worker takes over the dead
+    # worker's GPU; slot n on every GPU is claimed before slot n+1 on any of them
+    slot = 0
+    while True:
+        for index in range(gpu_count):
+            lock_file = open(os.path.join(tempfile.gettempdir(), f"stt-gpu-{index}-{slot}.lock"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            _gpu_lock_file = lock_file  # held open for the life of the process
+            return index
+        slot += 1
+
+def _load_whisper_model(model_name: str, device: str, compute_type: str) -> WhisperModel:
+    """Load a Whisper model, with Flash Attention when the GPU and CTranslate2 support it"""
+    options = dict(
+        model_size_or_path=model_name,
+        device=device,
+        device_index=gpu_index,
+        compute_type=compute_type,
+        cpu_threads=CPU_THREADS,
+        download_root=MODEL_DIR,
+        local_files_only=LOCAL_FILES_ONLY
+    )
+    if FLASH_ATTENTION and device == "cuda" and torch.cuda.get_device_capability(gpu_index)[0] >= 8:
+        try:
+            return WhisperModel(**options, flash_attention=True)
+        except Exception as e:
+            logger.warning("Flash Attention unavailable for %s, loading without it: %s", model_name, e)
+    return WhisperModel(**options)
+
+def _warm_up_model(whisper_model: WhisperModel, pipeline: BatchedInferencePipeline):
+    """Run silent dummy transcriptions so kernel selection and allocator growth happen before real traffic"""
+    # Beam 5 is the widest default (long clips) and reserves the largest decoder buffers up front
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    segments, _ = whisper_model.transcribe(silence, beam_size=5, language="en")
+    list(segments)
+    
+    # One window per batch slot to exercise the batched encoder at full batch size
+    batch_silence = np.zeros(SAMPLE_RATE * BATCH_SIZE, dtype=np.float32)
+    segments, _ = pipeline.transcribe(
+        batch_silence,
+        batch_size=BATCH_SIZE,
+        beam_size=5,
+        language="en",
+        clip_timestamps=[
+            {"start": i * SAMPLE_RATE, "end": (i + 1) * SAMPLE_RATE}
+            for i in range(BATCH_SIZE)
+        ]
+    )
+    list(segments)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the Whisper model on startup"""
-    global model
+    global model, batched_model, fast_model, batched_fast_model, english_model, batched_english_model
+    global transcribe_queue, batch_worker_task, gpu_index
     try:
         logger.info("Initializing Faster Whisper model...")
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if torch.cuda.is_available() else "float32"
+        if device == "cuda":
+            gpu_index = _claim_gpu_index()
+        if COMPUTE_TYPE:
+            compute_type = COMPUTE_TYPE
+        elif device == "cuda":
+            # INT8 weights with FP16 activations need tensor cores (Turing / compute capability 7.0+)
+            major, _ = torch.cuda.get_device_capability(gpu_index)
+            compute_type = "int8_float16" if major >= 7 else "float16"
+        else:
+            compute_type = "int8"
         
-        model = WhisperModel(
-            model_size_or_path="large-v3",
-            device=device,
-            compute_type=compute_type,
-            download_root=os.path.join(os.path.dirname(__file__), "models")
-        )
+        model = _load_whisper_model(MODEL_NAME, device, compute_type)
+        batched_model = BatchedInferencePipeline(model=model)
+        
+        if FAST_MODEL:
+            fast_model = _load_whisper_model(FAST_MODEL, device, compute_type)
+            batched_fast_model = BatchedInferencePipeline(model=fast_model)
+            logger.info("Fast Whisper model %s initialized", FAST_MODEL)
+        
+        if ENGLISH_MODEL:
+            english_model = _load_whisper_model(ENGLISH_MODEL, device, compute_type)
+            batched_english_model = BatchedInferencePipeline(model=english_model)
+            logger.info("English Whisper model %s initialized", ENGLISH_MODEL)
+        
+        # Warm up before serving so the first request does not pay the GPU autotune cost; there
+        # is nothing to autotune on CPU, where a warm-up pass only delays startup
+        if device == "cuda":
+            loop = asyncio.get_running_loop()
+            for whisper_model, pipeline in (
+                (model, batched_model),
+                (fast_model, batched_fast_model),
+                (english_model, batched_english_model)
+            ):
+                if whisper_model is None:
+                    continue
+                try:
+                    await loop.run_in_executor(stt_executor, _warm_up_model, whisper_model, pipeline)
+                except Exception as e:
+                    logger.warning("Whisper model warm-up failed: %s", e)
+            logger.info("Whisper model warm-up complete")
         
-        logger.info(f"Faster Whisper model initialized successfully on {device}")
+        # Start the cross-request batching worker
+        transcribe_queue = asyncio.Queue()
+        batch_worker_task = asyncio.create_task(transcription_worker())
+        
+        logger.info("Faster Whisper model initialized successfully on %s:%s (%s)", device, gpu_index, compute_type)
         
         # Create voice notes folder structure
         await create_vnotes_structure()
         
     except Exception as e:
-        logger.error(f"Failed to initialize Whisper model: {str(e)}")
+        logger.error("Failed to initialize Whisper model: %s", e)
         raise RuntimeError("Failed to initialize STT model")
 
 async def create_vnotes_structure():
@@ -129,21 +686,9 @@ async def create_vnotes_structure():
             f.write("# User code mapping file\n")
             f.write("# Format: USERCODE=directory-name\n")
             f.write("# Example: VFRDZ3=jbeasley-VFRDZ3\n")
-        logger.info(f"Created user mapping file: {users_file}")
+        logger.info("Created user mapping file: %s", users_file)
     
-    logger.info(f"Voice notes directory structure created at {VNOTES_DIR}")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup output and upload files on shutdown"""
-    try:
-        shutil.rmtree(OUTPUT_DIR)
-        shutil.rmtree(UPLOAD_DIR)
-        os.makedirs(OUTPUT_DIR)
-        os.makedirs(UPLOAD_DIR)
-        logger.info("Output and upload files cleaned up")
-    except Exception as e:
-        logger.error(f"Error cleaning up files: {str(e)}")
+    logger.info("Voice notes directory structure created at %s", VNOTES_DIR)
 
 # ORIGINAL ROUTES (Keep for backward compatibility during transition)
 @app.get("/", response_class=HTMLResponse)
@@ -216,24 +761,25 @@ async def user_browse_folders(user_code: str):
             }
         ]
         
-        # Ensure all folders exist
-        for folder in folders:
-            os.makedirs(folder["path"], exist_ok=True)
+        # Folders are created by get_user_directory the first time the user is seen
         
-        logger.info(f"User {user_code} - Available folders: {[f['value'] for f in folders]}")
+        logger.info("User %s - Available folders: %s", user_code, [f['value'] for f in folders])
         return {"folders": folders}
         
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Error browsing folders for user {user_code}: {str(e)}")
+        logger.error("Error browsing folders for user %s: %s", user_code, e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/user/{user_code}/transcribe-and-save")
+@app.post("/user/{user_code}/transcribe-and-save", response_model=SavedTranscriptionResult)
 async def user_transcribe_and_save(
     user_code: str,
     audio: UploadFile = File(...),
-    folder: str = Form("daily_notes")
+    folder: str = Form("daily_notes"),
+    beam_size: Optional[int] = Form(None),
+    model_choice: str = Form("fast", alias="model"),
+    vad: bool = True
 ):
     """Transcribe audio and save to user's specific directory"""
     try:
@@ -241,14 +787,19 @@ async def user_transcribe_and_save(
         user_dir = get_user_directory(user_code)
         
         # Add logging to debug folder parameter
-        logger.info(f"User {user_code} - Received transcription request for folder: '{folder}'")
+        logger.info("User %s - Received transcription request for folder: '%s'", user_code, folder)
         
         # Validate folder parameter
         valid_folders = ["daily_notes", "meeting_notes", "ideas", "research"]
         if folder not in valid_folders:
-            logger.warning(f"User {user_code} - Invalid folder '{folder}', using 'daily_notes' instead")
+            logger.warning("User %s - Invalid folder '%s', using 'daily_notes' instead", user_code, folder)
             folder = "daily_notes"
         
+        # Validate model parameter
+        if model_choice not in ("fast", "accurate"):
+            logger.warning("User %s - Invalid model '%s', using 'fast' instead", user_code, model_choice)
+            model_choice = "fast"
+        
         # Generate timestamp for filenames
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         
@@ -258,39 +809,60 @@ async def user_transcribe_and_save(
         # Create target folder path within user directory
         target_folder = os.path.join(user_dir, folder)
         os.makedirs(target_folder, exist_ok=True)
-        logger.info(f"User {user_code} - Saving to target folder: {target_folder}")
-        
-        # Save audio file temporarily for transcription
-        temp_audio_path = os.path.join(UPLOAD_DIR, f"{user_code}_{audio.filename}")
-        with open(temp_audio_path, "wb") as f:
-            content = await audio.read()
-            f.write(content)
-
-        # Transcribe audio
-        logger.info(f"User {user_code} - Transcribing and saving audio: {audio.filename}")
-        segments, info = model.transcribe(
-            temp_audio_path,
-            beam_size=5,
-            word_timestamps=True
-        )
-        
-        transcription = " ".join([segment.text for segment in segments])
+        logger.info("User %s - Saving to target folder: %s", user_code, target_folder)
         
-        # Save audio file to target folder
+        # Stream the upload once to a temporary name beside its final location; it is renamed
+        # into place only after the transcript is written, so a failure or client disconnect at
+        # any point never leaves orphaned or partial audio in the notes folder
         audio_filename = f"{timestamp}{audio_extension}"
         audio_save_path = os.path.join(target_folder, audio_filename)
-        shutil.copy2(temp_audio_path, audio_save_path)
-        logger.info(f"User {user_code} - Audio saved to: {audio_save_path}")
-        
-        # Save transcription file
-        text_filename = f"{timestamp}.txt"
-        text_save_path = os.path.join(target_folder, text_filename)
-        with open(text_save_path, "w", encoding="utf-8") as f:
-            f.write(transcription)
-        logger.info(f"User {user_code} - Transcription saved to: {text_save_path}")
-        
-        # Cleanup temp file
-        os.unlink(temp_audio_path)
+        partial_audio_path = os.path.join(target_folder, f".{audio_filename}.part")
+        saved = False
+        try:
+            await _save_upload(audio, partial_audio_path)
+            
+            # Transcribe the saved audio
+            logger.info("User %s - Transcribing and saving audio: %s", user_code, audio.filename)
+            cached_language = get_cached_language(user_code)
+            segments, info = await _transcribe(
+                partial_audio_path,
+                pipeline=_select_pipeline(model_choice, cached_language),
+                language=cached_language,
+                beam_size=beam_size,
+                vad_filter=vad,
+                vad_parameters=VAD_PARAMETERS
+            )
+            
+            transcription = _join_segments(segments)
+            
+            # Remember the detected language only when it was actually detected, and confidently
+            if cached_language is None and (info.language_probability or 0.0) >= LANGUAGE_CACHE_MIN_PROBABILITY:
+                user_lang_cache[user_code] = (info.language, time.monotonic())
+            
+            # Save the metadata sidecar first and the transcription last, each atomically: the
+            # .txt is what makes a note appear in the saved-notes listing
+            metadata_save_path = os.path.join(target_folder, f"{timestamp}.json")
+            await _write_text_atomic(metadata_save_path, json.dumps({
+                "language": info.language,
+                "language_probability": info.language_probability,
+                "duration": info.duration
+            }))
+            
+            # Save transcription file
+            text_filename = f"{timestamp}.txt"
+            text_save_path = os.path.join(target_folder, text_filename)
+            await _write_text_atomic(text_save_path, transcription)
+            logger.info("User %s - Transcription saved to: %s", user_code, text_save_path)
+            
+            os.replace(partial_audio_path, audio_save_path)
+            saved = True
+            logger.info("User %s - Audio saved to: %s", user_code, audio_save_path)
+        finally:
+            if not saved:
+                try:
+                    os.unlink(partial_audio_path)
+                except FileNotFoundError:
+                    pass
         
         # Return result with user context
         return {
@@ -301,7 +873,8 @@ async def user_transcribe_and_save(
             "user_code": user_code,
             "saved_files": {
                 "audio": audio_save_path,
-                "transcription": text_save_path
+                "transcription": text_save_path,
+                "metadata": metadata_save_path
             },
             "timestamp": timestamp
         }
@@ -309,17 +882,12 @@ async def user_transcribe_and_save(
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"User {user_code} - Error in transcribe and save: {str(e)}")
-        if 'temp_audio_path' in locals() and os.path.exists(temp_audio_path):
-            try:
-                os.unlink(temp_audio_path)
-            except:
-                pass
+        logger.error("User %s - Error in transcribe and save: %s", user_code, e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/user/{user_code}/saved-notes")
-async def user_get_saved_notes(user_code: str, folder: str = None):
-    """Get list of saved notes for a specific user"""
+@app.get("/user/{user_code}/saved-notes", response_model=SavedNotesList)
+def user_get_saved_notes(user_code: str, folder: str = None):
+    """Get list of saved notes for a specific user (sync: the folder scans run in the threadpool)"""
     try:
         user_dir = get_user_directory(user_code)
         notes = []
@@ -340,40 +908,52 @@ async def user_get_saved_notes(user_code: str, folder: str = None):
         # Sort by timestamp (newest first)
         notes.sort(key=lambda x: x["timestamp"], reverse=True)
         
-        logger.info(f"User {user_code} - Retrieved {len(notes)} saved notes")
+        logger.info("User %s - Retrieved %s saved notes", user_code, len(notes))
         return {"notes": notes, "user_code": user_code}
     
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"User {user_code} - Error getting saved notes: {str(e)}")
+        logger.error("User %s - Error getting saved notes: %s", user_code, e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/user/{user_code}/note/{folder}/{filename}")
+async def user_get_note_file(user_code: str, folder: str, filename: str):
+    """Serve a saved transcription or audio file for a specific user"""
+    user_dir = get_user_directory(user_code)
+    
+    # Only plain file names inside one of the user's note folders may be served
+    valid_folders = ["daily_notes", "meeting_notes", "ideas", "research"]
+    allowed_extensions = [".txt"] + AUDIO_EXTENSIONS
+    if folder not in valid_folders or os.path.basename(filename) != filename \
+            or os.path.splitext(filename)[1] not in allowed_extensions:
+        raise HTTPException(status_code=400, detail="Invalid note path")
+    
+    file_path = os.path.join(user_dir, folder, filename)
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"Note '{filename}' not found")
+    
+    # FileResponse streams from disk (sendfile where available)
+    if filename.endswith(".txt"):
+        return FileResponse(file_path, media_type="text/plain; charset=utf-8")
+    return FileResponse(file_path)
+
 # LEGACY ROUTES (Keep for backward compatibility)
-@app.post("/transcribe")
-async def transcribe_audio(audio: UploadFile = File(...)):
+@app.post("/transcribe", response_model=TranscriptionResult)
+async def transcribe_audio(audio: UploadFile = File(...), beam_size: Optional[int] = Form(None), vad: bool = True):
     """Legacy transcribe endpoint - transcribe only, no saving"""
     try:
-        # Save uploaded file
-        audio_path = os.path.join(UPLOAD_DIR, audio.filename)
-        
-        with open(audio_path, "wb") as f:
-            content = await audio.read()
-            f.write(content)
-
-        # Transcribe audio
-        logger.info(f"Legacy transcribe - Transcribing audio file: {audio.filename}")
-        segments, info = model.transcribe(
-            audio_path,
-            beam_size=5,
-            word_timestamps=True
+        # Transcribe audio straight from the received (spooled) upload; nothing extra is written to disk
+        logger.info("Legacy transcribe - Transcribing audio file: %s (%s bytes)", audio.filename, audio.size)
+        segments, info = await _transcribe(
+            audio.file,
+            beam_size=beam_size,
+            vad_filter=vad,
+            vad_parameters=VAD_PARAMETERS
         )
         
         # Format results
-        transcription = " ".join([segment.text for segment in segments])
-        
-        # Cleanup
-        os.unlink(audio_path)
+        transcription = _join_segments(segments)
         
         return {
             "text": transcription,
@@ -382,38 +962,24 @@ async def transcribe_audio(audio: UploadFile = File(...)):
         }
     
     except Exception as e:
-        logger.error(f"Error transcribing audio: {str(e)}")
-        if 'audio_path' in locals() and os.path.exists(audio_path):
-            try:
-                os.unlink(audio_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup file after error: {str(cleanup_error)}")
+        logger.error("Error transcribing audio: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/transcribe-blob")
-async def transcribe_blob(audio: UploadFile = File(...)):
+@app.post("/transcribe-blob", response_model=TranscriptionResult)
+async def transcribe_blob(audio: UploadFile = File(...), beam_size: Optional[int] = Form(None), vad: bool = True):
     """Legacy transcribe blob endpoint"""
     try:
-        # Save uploaded blob
-        audio_path = os.path.join(UPLOAD_DIR, "recorded_audio.wav")
-
-        with open(audio_path, "wb") as f:
-            content = await audio.read()
-            f.write(content)
-
-        # Transcribe audio
-        logger.info("Legacy transcribe blob - Transcribing recorded audio")
-        segments, info = model.transcribe(
-            audio_path,
-            beam_size=5,
-            word_timestamps=True
+        # Transcribe the recorded blob straight from the received upload
+        logger.info("Legacy transcribe blob - Transcribing recorded audio (%s bytes)", audio.size)
+        segments, info = await _transcribe(
+            audio.file,
+            beam_size=beam_size,
+            vad_filter=vad,
+            vad_parameters=VAD_PARAMETERS
         )
 
         # Format results
-        transcription = " ".join([segment.text for segment in segments])
-
-        # Cleanup
-        os.unlink(audio_path)
+        transcription = _join_segments(segments)
 
         return {
             "text": transcription,
@@ -422,18 +988,66 @@ async def transcribe_blob(audio: UploadFile = File(...)):
         }
 
     except Exception as e:
-        logger.error(f"Error transcribing recorded audio: {str(e)}")
-        if 'audio_path' in locals() and os.path.exists(audio_path):
-            try:
-                os.unlink(audio_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup file after error: {str(cleanup_error)}")
+        logger.error("Error transcribing recorded audio: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/v1/audio/transcriptions")
+@app.post("/transcribe-stream")
+async def transcribe_stream(
+    audio: UploadFile = File(...),
+    beam_size: Optional[int] = Form(None),
+    model_choice: str = Form("fast", alias="model"),
+    vad: bool = True
+):
+    """Transcribe audio and stream each segment as a server-sent event as soon as it is decoded"""
+    if model_choice not in ("fast", "accurate"):
+        model_choice = "fast"
+    loop = asyncio.get_running_loop()
+    try:
+        logger.info("Stream transcribe - Transcribing audio file: %s (%s bytes)", audio.filename, audio.size)
+        # Decode before responding; the upload is closed before the body is streamed
+        samples = await loop.run_in_executor(decode_executor, decode_audio, audio.file, SAMPLE_RATE)
+        if beam_size is None:
+            beam_size = 1 if len(samples) / SAMPLE_RATE < SHORT_CLIP_SECONDS else 5
+        
+        # Use the sequential model rather than the batching queue: it yields one window at a time
+        whisper_model = _select_pipeline(model_choice).model
+        segments, info = await loop.run_in_executor(
+            stt_executor,
+            lambda: whisper_model.transcribe(
+                samples,
+                beam_size=beam_size,
+                vad_filter=vad,
+                vad_parameters=VAD_PARAMETERS
+            )
+        )
+    except Exception as e:
+        logger.error("Error starting streamed transcription: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        yield f"event: info\ndata: {json.dumps({'language': info.language, 'language_probability': info.language_probability})}\n\n"
+        try:
+            while True:
+                # Each step decodes the next window on the inference thread, interleaved with queued batches
+                segment = await loop.run_in_executor(stt_executor, next, segments, None)
+                if segment is None:
+                    break
+                yield f"data: {json.dumps({'text': segment.text, 'start': segment.start, 'end': segment.end})}\n\n"
+        except Exception as e:
+            logger.error("Error during streamed transcription: %s", e)
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/v1/audio/transcriptions", response_model=OpenAITranscriptionResult)
 async def openai_transcribe(
     file: UploadFile = File(...),
-    model_name: str = Form(..., alias="model")
+    model_name: str = Form(..., alias="model"),
+    language: Optional[str] = Form(None),
+    beam_size: Optional[int] = Form(None),
+    vad_filter: bool = Form(True)
 ):
     """
     OpenAI Whisper API-compatible transcription endpoint.
@@ -442,93 +1056,141 @@ async def openai_transcribe(
     Parameters:
     - file: Audio file to transcribe (multipart/form-data)
     - model_name: Model name (currently ignored, always uses whisper large-v3)
+    - language: Optional ISO-639-1 code; skips detection, and "en" uses the English model if configured
+    - beam_size: Optional beam width (non-standard; defaults to greedy for short clips, 5 otherwise)
+    - vad_filter: Skip silent regions with Silero VAD before decoding (non-standard; default true)
 
     Returns:
     - JSON response in OpenAI format: {"text": "transcribed text"}
     """
     try:
-        # Save uploaded file temporarily
-        temp_path = os.path.join(UPLOAD_DIR, file.filename)
-
-        with open(temp_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-
-        # Transcribe using Whisper model
-        logger.info(f"OpenAI-compatible endpoint - Transcribing: {file.filename} (model param: {model_name})")
-        segments, info = model.transcribe(
-            temp_path,
-            beam_size=5,
-            word_timestamps=True
+        # Transcribe using Whisper model, reading the received upload in place
+        logger.info("OpenAI-compatible endpoint - Transcribing: %s (%s bytes, model param: %s)", file.filename, file.size, model_name)
+        segments, info = await _transcribe(
+            file.file,
+            pipeline=_select_pipeline("accurate", language),
+            language=language or None,
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            vad_parameters=VAD_PARAMETERS
         )
 
         # Format as OpenAI response (simple format)
-        transcription = " ".join([segment.text for segment in segments])
-
-        # Cleanup temp file
-        os.unlink(temp_path)
+        transcription = _join_segments(segments)
 
         # Return OpenAI-compatible response format
         return {"text": transcription}
 
     except Exception as e:
-        logger.error(f"OpenAI endpoint transcription error: {str(e)}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+        logger.error("OpenAI endpoint transcription error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-def _get_notes_from_folder(folder_path: str, folder_name: str) -> List[dict]:
-    """Helper function to get notes from a specific folder"""
+def _parse_note_timestamp(timestamp_str: str) -> datetime:
+    """Parse a YYYY-MM-DD_HH-MM-SS note name by slicing (much cheaper than strptime)"""
+    if len(timestamp_str) != 19 or timestamp_str[10] != '_' or \
+            timestamp_str[4] + timestamp_str[7] + timestamp_str[13] + timestamp_str[16] != '----':
+        raise ValueError(f"Not a note timestamp: {timestamp_str}")
+    return datetime(
+        int(timestamp_str[0:4]), int(timestamp_str[5:7]), int(timestamp_str[8:10]),
+        int(timestamp_str[11:13]), int(timestamp_str[14:16]), int(timestamp_str[17:19])
+    )
+
+def _file_signature(entry: os.DirEntry) -> tuple:
+    """Identify a file version; atomic replaces change the inode even when mtime is coarse"""
+    st = entry.stat()
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _scan_notes_folder(folder_path: str, folder_name: str) -> List[dict]:
+    """Build the note list for a folder from one directory scan, re-reading only changed notes"""
     notes = []
     
-    try:
-        for file in os.listdir(folder_path):
-            if file.endswith('.txt'):
-                # Extract timestamp from filename
-                timestamp_str = file.replace('.txt', '')
-                try:
-                    timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d_%H-%M-%S")
-                except ValueError:
-                    continue  # Skip files that don't match timestamp format
-                
-                file_path = os.path.join(folder_path, file)
-                
-                # Read transcription content
+    # One directory scan; audio counterparts and sidecars are then looked up by name
+    with os.scandir(folder_path) as it:
+        entries = {entry.name: entry for entry in it if entry.is_file()}
+    file_cache = _notes_index.setdefault(folder_path, {})
+    
+    for file, entry in entries.items():
+        if file.endswith('.txt'):
+            # Extract timestamp from filename
+            timestamp_str = file[:-4]
+            try:
+                timestamp = _parse_note_timestamp(timestamp_str)
+            except ValueError:
+                continue  # Skip files that don't match timestamp format
+            
+            sidecar = entries.get(f"{timestamp_str}.json")
+            signature = (_file_signature(entry), _file_signature(sidecar) if sidecar else None)
+            cached = file_cache.get(file)
+            if cached and cached[0] == signature:
+                content, metadata = cached[1]
+            else:
+                # Read only enough of the transcription for the preview; full text is served per note
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        content = f.read(101)
                 except:
                     content = "Error reading file"
                 
-                # Check for corresponding audio file
-                audio_extensions = ['.wav', '.mp3', '.m4a', '.ogg', '.webm']
-                audio_file = None
-                for ext in audio_extensions:
-                    potential_audio = os.path.join(folder_path, f"{timestamp_str}{ext}")
-                    if os.path.exists(potential_audio):
-                        audio_file = f"{timestamp_str}{ext}"
-                        break
-                
-                notes.append({
-                    "timestamp": timestamp.isoformat(),
-                    "folder": folder_name,
-                    "folder_display": folder_name.replace("_", " ").title(),
-                    "transcription_file": file,
-                    "audio_file": audio_file,
-                    "content_preview": content[:100] + "..." if len(content) > 100 else content,
-                    "full_content": content,
-                    "language_probability": 0.95  # Default since we don't store this separately
-                })
+                # Read transcription metadata sidecar if one was saved
+                metadata = {}
+                if sidecar:
+                    try:
+                        with open(sidecar.path, 'r', encoding='utf-8') as f:
+                            metadata = json.load(f)
+                    except (OSError, ValueError):
+                        pass
+                file_cache[file] = (signature, (content, metadata))
+            
+            # Check for corresponding audio file
+            audio_file = None
+            for ext in AUDIO_EXTENSIONS:
+                if f"{timestamp_str}{ext}" in entries:
+                    audio_file = f"{timestamp_str}{ext}"
+                    break
+            
+            notes.append({
+                "timestamp": timestamp.isoformat(),
+                "folder": folder_name,
+                "folder_display": folder_name.replace("_", " ").title(),
+                "transcription_file": file,
+                "audio_file": audio_file,
+                "content_preview": content[:100] + "..." if len(content) > 100 else content,
+                "language": metadata.get("language"),
+                "language_probability": metadata.get("language_probability"),
+                "duration": metadata.get("duration")
+            })
     
-    except Exception as e:
-        logger.error(f"Error reading folder {folder_path}: {str(e)}")
+    # Forget notes that were deleted
+    for file in file_cache.keys() - entries.keys():
+        file_cache.pop(file, None)
     
     return notes
 
+def _get_notes_from_folder(folder_path: str, folder_name: str) -> List[dict]:
+    """Helper function to get notes from a specific folder"""
+    try:
+        return _scan_notes_folder(folder_path, folder_name)
+    
+    except Exception as e:
+        logger.error("Error reading folder %s: %s", folder_path, e)
+        return []
+
 # PROTOTYPE ENDPOINTS (FIXED - No concatenation, individual chunk transcription)
+def _session_dir(session_id: str) -> str:
+    """Resolve a checkpoint session directory, rejecting ids that would escape CHECKPOINT_DIR"""
+    root = os.path.realpath(CHECKPOINT_DIR)
+    session_dir = os.path.realpath(os.path.join(root, session_id))
+    if os.path.dirname(session_dir) != root:
+        raise ValueError(f"Invalid session id: {session_id!r}")
+    return session_dir
+
+def _list_session(session_id: str) -> tuple:
+    """Return (session_dir, file names) for an existing session; run via asyncio.to_thread"""
+    session_dir = _session_dir(session_id)
+    if not os.path.exists(session_dir):
+        raise Exception(f"Session directory not found: {session_id}")
+    return session_dir, os.listdir(session_dir)
+
 @app.post("/prototype/checkpoint")
 async def save_checkpoint_prototype(
     session_id: str = Form(...),
@@ -539,90 +1201,131 @@ async def save_checkpoint_prototype(
     Prototype checkpoint endpoint - saves audio chunks for testing
     """
     try:
-        # Create session directory if not exists
-        session_dir = os.path.join(CHECKPOINT_DIR, session_id)
-        os.makedirs(session_dir, exist_ok=True)
+        # Create session directory if not exists (off the event loop)
+        session_dir = _session_dir(session_id)
+        await asyncio.to_thread(os.makedirs, session_dir, exist_ok=True)
         
-        # Save chunk with sequence number
-        chunk_filename = f"chunk_{chunk_number:03d}_{audio.filename}"
+        # Save chunk under a server-chosen name; only the extension of the client filename is kept
+        audio_extension = os.path.splitext(os.path.basename(audio.filename or ""))[1] or ".wav"
+        chunk_filename = f"chunk_{chunk_number:03d}_audio{audio_extension}"
         chunk_path = os.path.join(session_dir, chunk_filename)
         
         # Save uploaded audio chunk
-        with open(chunk_path, "wb") as f:
-            content = await audio.read()
-            f.write(content)
+        size_bytes = await _save_upload(audio, chunk_path)
         
         # Log for debugging
-        logger.info(f"Saved checkpoint: {chunk_path} ({len(content)} bytes)")
+        logger.info("Saved checkpoint: %s (%s bytes)", chunk_path, size_bytes)
         
         return {
             "status": "saved",
             "chunk_id": f"{session_id}_{chunk_number}",
             "file_path": chunk_path,
-            "size_bytes": len(content),
+            "size_bytes": size_bytes,
             "timestamp": datetime.now().isoformat()
         }
         
     except Exception as e:
-        logger.error(f"Checkpoint save failed: {str(e)}")
+        logger.error("Checkpoint save failed: %s", e)
         return {"status": "failed", "error": str(e)}
 
-@app.post("/prototype/transcribe-chunk")
+async def _transcribe_chunk(session_dir: str, chunk_number: int, session_files: List[str]) -> dict:
+    """Transcribe one checkpoint chunk and save its transcript next to it"""
+    # Find the specific chunk file
+    chunk_files = [f for f in session_files if f.startswith(f"chunk_{chunk_number:03d}_")
+                   and not f.endswith(".txt")]
+    
+    if not chunk_files:
+        raise Exception(f"Chunk {chunk_number} not found")
+    
+    chunk_path = os.path.join(session_dir, chunk_files[0])
+    
+    # Transcribe using the fast model with greedy decoding; chunks are only a few seconds long
+    logger.info("Transcribing chunk: %s", chunk_path)
+    segments, info = await _transcribe(
+        chunk_path,
+        pipeline=_select_pipeline("fast"),
+        beam_size=1,
+        vad_filter=True,
+        vad_parameters=VAD_PARAMETERS
+    )
+    
+    transcription = _join_segments(segments)
+    
+    # Save transcription as text file
+    text_filename = f"chunk_{chunk_number:03d}_transcript.txt"
+    text_path = os.path.join(session_dir, text_filename)
+    
+    async with aiofiles.open(text_path, "w", encoding="utf-8") as f:
+        await f.write(transcription)
+    
+    logger.info("Transcribed chunk %s: %s characters", chunk_number, len(transcription))
+    
+    return {
+        "status": "success",
+        "chunk_number": chunk_number,
+        "transcription": transcription,
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "audio_file": chunk_files[0],
+        "text_file": text_filename,
+        "char_count": len(transcription)
+    }
+
+@app.post("/prototype/transcribe-chunk", deprecated=True)
 async def transcribe_chunk_prototype(
     session_id: str = Form(...),
     chunk_number: int = Form(...)
 ):
     """
     Prototype endpoint - transcribe individual chunk using Whisper
+    (deprecated: use /prototype/transcribe-chunks to submit several chunks at once)
     """
     try:
-        session_dir = os.path.join(CHECKPOINT_DIR, session_id)
-        
-        if not os.path.exists(session_dir):
-            raise Exception(f"Session directory not found: {session_id}")
-        
-        # Find the specific chunk file
-        chunk_files = [f for f in os.listdir(session_dir) 
-                      if f.startswith(f"chunk_{chunk_number:03d}_")]
+        session_dir, session_files = await asyncio.to_thread(_list_session, session_id)
+        return await _transcribe_chunk(session_dir, chunk_number, session_files)
         
-        if not chunk_files:
-            raise Exception(f"Chunk {chunk_number} not found")
+    except Exception as e:
+        logger.error("Chunk transcription failed: %s", e)
+        return {"status": "failed", "error": str(e), "chunk_number": chunk_number}
+
+@app.post("/prototype/transcribe-chunks")
+async def transcribe_chunks_prototype(
+    session_id: str = Form(...),
+    chunk_numbers: str = Form(...)
+):
+    """
+    Prototype endpoint - transcribe several chunks (comma-separated numbers) in one request
+    """
+    try:
+        numbers = [int(n) for n in chunk_numbers.split(",") if n.strip()]
+        if not numbers:
+            raise Exception("No chunk numbers given")
         
-        chunk_path = os.path.join(session_dir, chunk_files[0])
+        session_dir, session_files = await asyncio.to_thread(_list_session, session_id)
         
-        # Transcribe using Whisper
-        logger.info(f"Transcribing chunk: {chunk_path}")
-        segments, info = model.transcribe(
-            chunk_path,
-            beam_size=5,
-            word_timestamps=True
+        # Chunks are queued concurrently; the worker packs the windows of whichever chunks are
+        # waiting (same model, language and options) into shared pipeline calls
+        outcomes = await asyncio.gather(
+            *(_transcribe_chunk(session_dir, n, session_files) for n in numbers),
+            return_exceptions=True
         )
         
-        transcription = " ".join([segment.text for segment in segments])
-        
-        # Save transcription as text file
-        text_filename = f"chunk_{chunk_number:03d}_transcript.txt"
-        text_path = os.path.join(session_dir, text_filename)
-        
-        with open(text_path, "w", encoding="utf-8") as f:
-            f.write(transcription)
-        
-        logger.info(f"Transcribed chunk {chunk_number}: {len(transcription)} characters")
+        results = []
+        for chunk_number, outcome in zip(numbers, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error("Chunk %s transcription failed: %s", chunk_number, outcome)
+                outcome = {"status": "failed", "error": str(outcome), "chunk_number": chunk_number}
+            results.append(outcome)
         
         return {
-            "status": "success",
-            "chunk_number": chunk_number,
-            "transcription": transcription,
-            "language": info.language,
-            "language_probability": info.language_probability,
-            "audio_file": chunk_files[0],
-            "text_file": text_filename,
-            "char_count": len(transcription)
+            "status": "success" if all(r["status"] == "success" for r in results) else "partial",
+            "session_id": session_id,
+            "results": results
         }
         
     except Exception as e:
-        logger.error(f"Chunk transcription failed: {str(e)}")
-        return {"status": "failed", "error": str(e), "chunk_number": chunk_number}
+        logger.error("Batch chunk transcription failed: %s", e)
+        return {"status": "failed", "error": str(e)}
 
 @app.post("/prototype/assemble-session")
 async def assemble_session_prototype(session_id: str = Form(...)):
@@ -630,39 +1333,31 @@ async def assemble_session_prototype(session_id: str = Form(...)):
     Prototype endpoint - assemble all chunk transcriptions into final text
     """
     try:
-        session_dir = os.path.join(CHECKPOINT_DIR, session_id)
-        
-        if not os.path.exists(session_dir):
-            raise Exception(f"Session directory not found: {session_id}")
+        session_dir, session_files = await asyncio.to_thread(_list_session, session_id)
         
         # Find all transcript files
-        transcript_files = []
-        for file in os.listdir(session_dir):
-            if file.endswith("_transcript.txt"):
-                transcript_files.append(file)
+        transcript_files = [file for file in session_files if file.endswith("_transcript.txt")]
         
         if not transcript_files:
             raise Exception("No transcription files found")
         
-        # Sort by chunk number
-        transcript_files.sort()
+        # Sort by parsed chunk number (chunk_<n>_transcript.txt), not lexicographically
+        transcript_files.sort(key=lambda name: int(name.split("_")[1]))
         
-        # Read and combine all transcriptions
-        combined_text = []
-        chunk_details = []
+        # Read all transcriptions concurrently
+        async def read_transcript(transcript_file: str) -> str:
+            async with aiofiles.open(os.path.join(session_dir, transcript_file), "r", encoding="utf-8") as f:
+                return (await f.read()).strip()
         
-        for transcript_file in transcript_files:
-            transcript_path = os.path.join(session_dir, transcript_file)
-            
-            with open(transcript_path, "r", encoding="utf-8") as f:
-                chunk_text = f.read().strip()
-                combined_text.append(chunk_text)
-                
-                chunk_details.append({
-                    "file": transcript_file,
-                    "length": len(chunk_text),
-                    "preview": chunk_text[:50] + "..." if len(chunk_text) > 50 else chunk_text
-                })
+        combined_text = await asyncio.gather(*(read_transcript(f) for f in transcript_files))
+        chunk_details = [
+            {
+                "file": transcript_file,
+                "length": len(chunk_text),
+                "preview": chunk_text[:50] + "..." if len(chunk_text) > 50 else chunk_text
+            }
+            for transcript_file, chunk_text in zip(transcript_files, combined_text)
+        ]
         
         # Combine with spaces
         final_text = " ".join(combined_text)
@@ -671,10 +1366,10 @@ async def assemble_session_prototype(session_id: str = Form(...)):
         final_filename = "final_transcription.txt"
         final_path = os.path.join(session_dir, final_filename)
         
-        with open(final_path, "w", encoding="utf-8") as f:
-            f.write(final_text)
+        async with aiofiles.open(final_path, "w", encoding="utf-8") as f:
+            await f.write(final_text)
         
-        logger.info(f"Assembled {len(transcript_files)} chunks into final transcription")
+        logger.info("Assembled %s chunks into final transcription", len(transcript_files))
         
         return {
             "status": "success",
@@ -686,28 +1381,35 @@ async def assemble_session_prototype(session_id: str = Form(...)):
         }
         
     except Exception as e:
-        logger.error(f"Session assembly failed: {str(e)}")
+        logger.error("Session assembly failed: %s", e)
         return {"status": "failed", "error": str(e)}
 
 @app.get("/prototype/sessions")
-async def list_checkpoint_sessions():
-    """List all prototype checkpoint sessions for debugging"""
+def list_checkpoint_sessions():
+    """List all prototype checkpoint sessions for debugging (sync: runs in the threadpool)"""
     try:
         sessions = []
         if os.path.exists(CHECKPOINT_DIR):
-            for session_id in os.listdir(CHECKPOINT_DIR):
-                session_path = os.path.join(CHECKPOINT_DIR, session_id)
-                if os.path.isdir(session_path):
-                    chunk_count = len([f for f in os.listdir(session_path) 
-                                     if f.startswith("chunk_") and not f.endswith(".txt")])
-                    transcript_count = len([f for f in os.listdir(session_path) 
-                                          if f.endswith("_transcript.txt")])
+            with os.scandir(CHECKPOINT_DIR) as session_entries:
+                for session_entry in session_entries:
+                    if not session_entry.is_dir():
+                        continue
+                    
+                    # Count chunks and transcripts in a single pass over the session directory
+                    chunk_count = 0
+                    transcript_count = 0
+                    with os.scandir(session_entry.path) as it:
+                        for entry in it:
+                            if entry.name.endswith("_transcript.txt"):
+                                transcript_count += 1
+                            elif entry.name.startswith("chunk_") and not entry.name.endswith(".txt"):
+                                chunk_count += 1
                     
                     sessions.append({
-                        "session_id": session_id,
+                        "session_id": session_entry.name,
                         "chunk_count": chunk_count,
                         "transcript_count": transcript_count,
-                        "created": datetime.fromtimestamp(os.path.getctime(session_path)).isoformat()
+                        "created": datetime.fromtimestamp(session_entry.stat().st_ctime).isoformat()
                     })
         
         return {"sessions": sessions}
@@ -718,8 +1420,8 @@ async def list_checkpoint_sessions():
 async def health_check():
     """Health check endpoint"""
     if torch.cuda.is_available():
-        total_memory = torch.cuda.get_device_properties(0).total_memory
-        free_memory = torch.cuda.memory_reserved(0) - torch.cuda.memory_allocated(0)
+        total_memory = torch.cuda.get_device_properties(gpu_index).total_memory
+        free_memory = torch.cuda.memory_reserved(gpu_index) - torch.cuda.memory_allocated(gpu_index)
         memory_info = {
             "total_gpu_memory": f"{total_memory / (1024**3):.2f} GB",
             "free_gpu_memory": f"{free_memory / (1024**3):.2f} GB",
@@ -742,8 +1444,19 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
+    
+    # Every worker process loads its own full model set (main, fast and English models), so memory
+    # use grows linearly with WORKERS. One worker relies on the batching queue for concurrency;
+    # raise WORKERS only when there is memory for the extra copies, e.g. one worker per GPU
+    # (each claims its own GPU at startup)
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        # Split the cores between workers instead of every model claiming all of them
+        os.environ.setdefault("STT_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    
     uvicorn.run(
-        app,
+        "main-ui:app" if workers > 1 else app,
         host="0.0.0.0",
-        port=8000
+        port=8000,
+        workers=workers
     )
\ No newline at end of file
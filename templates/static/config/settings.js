@@ -8,6 +8,7 @@ const VoiceNotesConfig = {
             browseFolder: '/browse-folders',
             transcribeAndSave: '/transcribe-and-save',
             savedNotes: '/saved-notes',
+            noteFile: '/note',
             health: '/health'
         },
         timeouts: {
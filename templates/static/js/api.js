@@ -117,6 +117,18 @@ const VoiceNotesAPI = {
         }
     },
 
+    // Load the full text of a saved note (the notes list only carries a preview)
+    async loadNoteContent(note) {
+        try {
+            const endpoint = `${VoiceNotesConfig.api.endpoints.noteFile}/${encodeURIComponent(note.folder)}/${encodeURIComponent(note.transcription_file)}`;
+            const response = await this.fetchWithTimeout(this.buildURL(endpoint));
+            return await response.text();
+        } catch (error) {
+            console.error('Error loading note content:', error);
+            throw new Error('Failed to load note: ' + VoiceNotesUtils.getErrorMessage(error));
+        }
+    },
+
     // Check server health
     async checkHealth() {
         try {
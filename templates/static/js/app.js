@@ -281,30 +281,31 @@ const VoiceNotesApp = {
                 return;
             }
             
-            let transcriptionResults = [];
+            // Transcribe all chunks in one request so the server can batch them
+            this.updatePrototypeStatus(`Transcribing ${chunkCount} chunks...`);
             
-            // Transcribe each chunk individually
-            for (let i = 0; i < chunkCount; i++) {
-                this.updatePrototypeStatus(`Transcribing chunk ${i + 1} of ${chunkCount}...`);
-                
-                const formData = new FormData();
-                formData.append('session_id', sessionId);
-                formData.append('chunk_number', i);
-                
-                const response = await fetch('/prototype/transcribe-chunk', {
-                    method: 'POST',
-                    body: formData
-                });
-                
-                const result = await response.json();
-                transcriptionResults.push(result);
-                
+            const formData = new FormData();
+            formData.append('session_id', sessionId);
+            formData.append('chunk_numbers', Array.from({ length: chunkCount }, (_, i) => i).join(','));
+            
+            const response = await fetch('/prototype/transcribe-chunks', {
+                method: 'POST',
+                body: formData
+            });
+            
+            const batchResult = await response.json();
+            if (batchResult.status === 'failed') {
+                throw new Error(batchResult.error);
+            }
+            
+            const transcriptionResults = batchResult.results;
+            transcriptionResults.forEach((result, i) => {
                 if (result.status === 'success') {
                     console.log(`Chunk ${i} transcribed: "${result.transcription.substring(0, 50)}..."`);
                 } else {
                     console.error(`Chunk ${i} transcription failed:`, result.error);
                 }
-            }
+            });
             
             // Display results
             const successCount = transcriptionResults.filter(r => r.status === 'success').length;
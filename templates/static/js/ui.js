@@ -104,7 +104,10 @@ const VoiceNotesUI = {
         const { transcriptionText, confidenceBadge, transcriptionSection } = this.elements;
         
         transcriptionText.value = data.text;
-        confidenceBadge.textContent = VoiceNotesUtils.formatConfidence(data.language_probability);
+        // No probability when the language was reused from an earlier note instead of detected
+        confidenceBadge.textContent = data.language_probability != null
+            ? VoiceNotesUtils.formatConfidence(data.language_probability)
+            : '';
         transcriptionSection.classList.add('visible');
     },
 
@@ -185,12 +188,15 @@ const VoiceNotesUI = {
         noteDiv.className = 'note-item';
         
         const timeString = VoiceNotesUtils.formatTimestamp(new Date(note.timestamp));
-        const confidence = Math.round(note.language_probability * 100);
+        // Older notes have no saved metadata, so confidence may be unknown
+        const confidence = note.language_probability != null
+            ? `<span>🎯 ${Math.round(note.language_probability * 100)}% confidence</span>`
+            : '';
         
         noteDiv.innerHTML = `
             <div class="note-meta">
                 <span>📁 ${note.folder_display} • ${timeString}</span>
-                <span>🎯 ${confidence}% confidence</span>
+                ${confidence}
             </div>
             <div class="note-preview">${note.content_preview}</div>
         `;
@@ -203,10 +209,14 @@ const VoiceNotesUI = {
         return noteDiv;
     },
 
-    loadNoteContent(note) {
-        this.elements.transcriptionText.value = note.full_content;
-        this.elements.transcriptionSection.classList.add('visible');
-        this.showStatus('Note loaded for editing', 'success');
+    async loadNoteContent(note) {
+        try {
+            this.elements.transcriptionText.value = await VoiceNotesAPI.loadNoteContent(note);
+            this.elements.transcriptionSection.classList.add('visible');
+            this.showStatus('Note loaded for editing', 'success');
+        } catch (error) {
+            this.showStatus(VoiceNotesUtils.getErrorMessage(error), 'error');
+        }
     },
 
     // Loading states